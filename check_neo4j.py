@@ -2,7 +2,12 @@ from neo4j import GraphDatabase
 import config
 
 def check_database():
-    driver = GraphDatabase.driver(config.NEO4J_URI, auth=(config.NEO4J_USER, config.NEO4J_PASSWORD))
+    driver = GraphDatabase.driver(
+        config.NEO4J_URI,
+        auth=(config.NEO4J_USER, config.NEO4J_PASSWORD),
+        max_connection_pool_size=50,
+        connection_acquisition_timeout=30.0
+    )
     
     with driver.session() as session:
         # Count nodes by type
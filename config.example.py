@@ -3,7 +3,7 @@
 # The config.py file will be ignored by git for security
 
 # Neo4j Database (Local installation required)
-NEO4J_URI = "neo4j://127.0.0.1:7687"
+NEO4J_URI = "bolt://127.0.0.1:7687"  # direct connection, no routing discovery for a single local instance
 NEO4J_USER = "neo4j"
 NEO4J_PASSWORD = "your-neo4j-password-here"  # Replace with your Neo4j password
 
@@ -21,6 +21,10 @@ PINECONE_API_KEY = "your-pinecone-api-key-here"
 PINECONE_ENV = "us-east1-gcp"  # Check your Pinecone dashboard for correct environment
 PINECONE_INDEX_NAME = "vietnam-travel"
 PINECONE_VECTOR_DIM = 384  # For sentence-transformers all-MiniLM-L6-v2 model
+# Re-score the top-k locally against stored vectors. Off by default: on a cosine index
+# this reproduces Pinecone's own scores, so only enable it if the index metric or
+# stored vectors differ from the query embedder.
+RERANK_TOP_K = False
 
 # Instructions:
 # 1. Sign up for OpenRouter: https://openrouter.ai/keys
@@ -1,100 +1,315 @@
+import os
 import json
 import asyncio
-from sentence_transformers import SentenceTransformer
+import functools
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import numpy as np
+import diskcache
 from pinecone import Pinecone
 from neo4j import GraphDatabase
 from openai import OpenAI
 import config
+import rerank
+
+# Optional int8 ONNX Runtime backend for query embeddings. Only the runtime pieces are
+# imported here; optimum (which pulls in torch) is imported for the one-time export only.
+# Broad except: a mismatched install can fail with more than ImportError, and we fall back to SBERT.
+try:
+    from onnxruntime import InferenceSession
+    from transformers import AutoTokenizer
+    ONNX_AVAILABLE = True
+except Exception:
+    ONNX_AVAILABLE = False
+
+# Constant query text so every call hits Neo4j's plan cache
+# idx keeps the Pinecone rank of each id so facts come back best hit first
+GET_RELATED_CYPHER = """
+    UNWIND range(0, size($item_ids) - 1) AS idx
+    WITH idx, $item_ids[idx] AS item_id
+    MATCH (source:Entity {id: item_id})-[r]->(target)
+    WITH idx, item_id, collect({relation: type(r), name: target.name,
+                                description: target.description})[..3] AS tops
+    UNWIND tops AS top
+    RETURN item_id AS source, top.relation AS relation,
+           top.name AS name, top.description AS description
+    ORDER BY idx
+"""
+
+EMBEDDING_CACHE_SIZE = 2048
+EMBEDDING_CACHE_DIR = ".embedding_cache"
+EMBEDDING_MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"
+ONNX_MODEL_DIR = "onnx_model"
+PINECONE_POOL_THREADS = 8
+
+class QuantizedEmbedder:
+    """Dynamic int8 ONNX version of all-MiniLM-L6-v2 with a SentenceTransformer-style encode()"""
+
+    def __init__(self, model_id=EMBEDDING_MODEL_ID, model_dir=ONNX_MODEL_DIR):
+        model_path = os.path.join(model_dir, "model_quantized.onnx")
+        if not os.path.exists(model_path):
+            # One-time export + quantization, reused on every later start
+            print("Exporting quantized ONNX embedding model...")
+            from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+            from optimum.onnxruntime.configuration import AutoQuantizationConfig
+            
+            ort_model = ORTModelForFeatureExtraction.from_pretrained(model_id, export=True)
+            quantizer = ORTQuantizer.from_pretrained(ort_model)
+            qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+            quantizer.quantize(save_dir=model_dir, quantization_config=qconfig)
+            AutoTokenizer.from_pretrained(model_id).save_pretrained(model_dir)
+        
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+    
+    def encode(self, texts, normalize_embeddings=True):
+        """Mean-pooled embeddings as float32, L2-normalized like the SBERT pipeline"""
+        inputs = self.tokenizer(texts, padding=True, truncation=True, max_length=256, return_tensors="np")
+        feed = {k: v.astype(np.int64) for k, v in inputs.items() if k in self.input_names}
+        token_embeddings = self.session.run(None, feed)[0]
+        
+        mask = inputs["attention_mask"][..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if not normalize_embeddings:
+            return pooled.astype(np.float32)
+        norms = np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return (pooled / norms).astype(np.float32)
+
+def load_embedding_model():
+    """Use the quantized ONNX embedder when available, else plain SentenceTransformer"""
+    if ONNX_AVAILABLE:
+        try:
+            return QuantizedEmbedder()
+        except Exception as e:
+            print(f"ONNX embedder unavailable, falling back to PyTorch: {e}")
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer('all-MiniLM-L6-v2')
 
 class VietnamTravelChatbot:
+    SYSTEM_PROMPT = (
+        "You are a helpful Vietnam travel assistant with access to semantic search and knowledge graph data. "
+        "Follow this chain of thought:\n"
+        "1. ANALYZE: What type of travel experience is the user seeking?\n"
+        "2. MATCH: Which locations from the search results best fit their needs?\n"
+        "3. CONNECT: What related places or activities enhance the experience?\n"
+        "4. RECOMMEND: Provide specific, actionable suggestions with reasoning.\n"
+        "Be specific, cite actual places, and explain why each recommendation fits their query."
+    )
+    
+    USER_PROMPT_TEMPLATE = """User query: {query}
+
+Top semantic matches:
+{vec_context}
+
+Related places and connections:
+{graph_context}
+
+Based on the above context, provide a helpful response with specific recommendations."""
+    
     def __init__(self):
         # Initialize embedding model
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.embedding_model = load_embedding_model()
+        self.embedding_backend = "onnx-int8" if isinstance(self.embedding_model, QuantizedEmbedder) else "sbert-fp32"
         
-        # Embedding cache
-        self.embedding_cache = {}
+        # Persistent embedding cache shared across sessions, float32 bytes keyed by
+        # sha256(model:backend:query) so ONNX and PyTorch vectors never mix
+        self.disk_cache = diskcache.Cache(EMBEDDING_CACHE_DIR)
+        
+        # Bounded in-memory LRU in front of the disk cache, keyed by query string
+        self.cached_encode = functools.lru_cache(maxsize=EMBEDDING_CACHE_SIZE)(self._encode_query)
+        
+        # Optional local rerank; compile the Numba kernel now rather than on the first query
+        self.rerank_enabled = getattr(config, "RERANK_TOP_K", False)
+        if self.rerank_enabled:
+            rerank.warmup(config.PINECONE_VECTOR_DIM)
         
         # Initialize Pinecone
-        self.pc = Pinecone(api_key=config.PINECONE_API_KEY)
+        self.pc = Pinecone(api_key=config.PINECONE_API_KEY, pool_threads=PINECONE_POOL_THREADS)
         self.index = self.pc.Index(config.PINECONE_INDEX_NAME)
+        self.index_async = None  # created lazily inside the running event loop
+        self.index_async_unavailable = False
+        self.index_async_lock = asyncio.Lock()
         
         # Initialize Neo4j
         self.neo4j_driver = GraphDatabase.driver(
             config.NEO4J_URI,
-            auth=(config.NEO4J_USER, config.NEO4J_PASSWORD)
+            auth=(config.NEO4J_USER, config.NEO4J_PASSWORD),
+            max_connection_pool_size=50,
+            connection_acquisition_timeout=30.0
         )
         
-        # Initialize OpenRouter LLM
+        # Initialize OpenRouter LLM over a long-lived HTTP/2 client so TLS is reused across turns
+        self.http_client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=60.0),
+            timeout=30.0
+        )
         self.llm_client = OpenAI(
             api_key=config.OPENROUTER_API_KEY,
-            base_url=config.OPENROUTER_BASE_URL
+            base_url=config.OPENROUTER_BASE_URL,
+            http_client=self.http_client
         )
     
     def close(self):
         self.neo4j_driver.close()
+        self.disk_cache.close()
+        self.http_client.close()
+    
+    async def aclose(self):
+        if self.index_async is not None:
+            await self.index_async.close()
+            self.index_async = None
+        self.close()
+    
+    async def _get_async_index(self):
+        """Native asyncio Pinecone client, or None if the SDK or its asyncio extra is missing"""
+        if self.index_async is not None or self.index_async_unavailable:
+            return self.index_async
+        
+        # Concurrent queries (e.g. search_similar_batch_async) must share one client
+        async with self.index_async_lock:
+            if self.index_async is not None or self.index_async_unavailable:
+                return self.index_async
+            if not hasattr(self.pc, "IndexAsyncio"):
+                self.index_async_unavailable = True
+                return None
+            
+            # describe_index is a blocking HTTP call, keep it off the event loop
+            loop = asyncio.get_running_loop()
+            description = await loop.run_in_executor(
+                None, self.pc.describe_index, config.PINECONE_INDEX_NAME
+            )
+            try:
+                self.index_async = self.pc.IndexAsyncio(host=description.host)
+            except ImportError as e:
+                # pinecone[asyncio] extra (aiohttp) not installed
+                print(f"Pinecone asyncio client unavailable, using thread pool: {e}")
+                self.index_async_unavailable = True
+        return self.index_async
+    
+    def _cache_key(self, query):
+        return hashlib.sha256(f"{EMBEDDING_MODEL_ID}:{self.embedding_backend}:{query}".encode("utf-8")).hexdigest()
+    
+    def _encode_query(self, query):
+        """Encode one query as a unit-norm float32 array, read-only since it is shared via the cache"""
+        key = self._cache_key(query)
+        cached = self.disk_cache.get(key)
+        if cached is not None:
+            return np.frombuffer(cached, dtype=np.float32)
+        
+        embedding = self._encode_batch([query])[0]
+        self.disk_cache.set(key, embedding.tobytes())
+        embedding.setflags(write=False)
+        return embedding
+    
+    def _encode_batch(self, texts):
+        """Unit-norm float32 embeddings, one row per text"""
+        embeddings = self.embedding_model.encode(texts, normalize_embeddings=True)
+        return np.asarray(embeddings, dtype=np.float32)
     
     def get_cached_embedding(self, query):
         """Get embedding with caching"""
-        if query in self.embedding_cache:
-            return self.embedding_cache[query]
+        return self.cached_encode(query)
+    
+    def get_cached_embeddings(self, queries):
+        """Get embeddings for several queries, encoding all cache misses in one call"""
+        missing = [q for q in dict.fromkeys(queries) if self._cache_key(q) not in self.disk_cache]
+        if missing:
+            for query, embedding in zip(missing, self._encode_batch(missing)):
+                self.disk_cache.set(self._cache_key(query), embedding.tobytes())
+        # Everything is on disk now, so this only fills the in-memory LRU
+        return [self.get_cached_embedding(q) for q in queries]
+    
+    def _rank(self, vector, matches):
+        """Pinecone's order as-is, or re-scored locally when RERANK_TOP_K is on"""
+        if not self.rerank_enabled:
+            return matches
+        return rerank.rerank(vector, matches)
+    
+    async def _query_async(self, vector, top_k):
+        """Run one Pinecone query without blocking the event loop"""
+        index_async = await self._get_async_index()
+        if index_async is not None:
+            results = await index_async.query(
+                vector=vector.tolist(),
+                top_k=top_k,
+                include_metadata=True,
+                include_values=self.rerank_enabled
+            )
+        else:
+            # Older SDKs have no async client, so use the thread pool
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(
+                None, 
+                lambda: self.index.query(
+                    vector=vector.tolist(),
+                    top_k=top_k,
+                    include_metadata=True,
+                    include_values=self.rerank_enabled
+                )
+            )
         
-        embedding = self.embedding_model.encode([query]).tolist()[0]
-        self.embedding_cache[query] = embedding
-        return embedding
+        return self._rank(vector, results['matches'])
     
     async def search_similar_async(self, query, top_k=5):
         """Async search for similar items using Pinecone"""
         query_embedding = self.get_cached_embedding(query)
-        
-        # Run Pinecone query in thread pool since it's not async
-        loop = asyncio.get_event_loop()
-        results = await loop.run_in_executor(
-            None, 
-            lambda: self.index.query(
-                vector=query_embedding,
-                top_k=top_k,
-                include_metadata=True
-            )
-        )
-        
-        return results['matches']
+        return await self._query_async(query_embedding, top_k)
     
     def search_similar(self, query, top_k=5):
         """Search for similar items using Pinecone (sync version)"""
         query_embedding = self.get_cached_embedding(query)
         
         results = self.index.query(
-            vector=query_embedding,
+            vector=query_embedding.tolist(),
             top_k=top_k,
-            include_metadata=True
+            include_metadata=True,
+            include_values=self.rerank_enabled
         )
         
-        return results['matches']
+        return self._rank(query_embedding, results['matches'])
+    
+    async def search_similar_batch_async(self, queries, top_k=5):
+        """Async search for several queries at once, one match list per query"""
+        if not queries:
+            return []
+        # Single encode call for the cache misses, then all Pinecone queries in flight together
+        embeddings = self.get_cached_embeddings(queries)
+        return await asyncio.gather(*[self._query_async(emb, top_k) for emb in embeddings])
+    
+    def search_similar_batch(self, queries, top_k=5):
+        """Search for several queries at once (sync version)"""
+        if not queries:
+            return []
+        embeddings = self.get_cached_embeddings(queries)
+        with ThreadPoolExecutor(max_workers=min(len(embeddings), PINECONE_POOL_THREADS)) as executor:
+            results = executor.map(
+                lambda emb: self.index.query(vector=emb.tolist(), top_k=top_k, include_metadata=True, include_values=self.rerank_enabled),
+                embeddings
+            )
+            return [self._rank(emb, r['matches']) for emb, r in zip(embeddings, results)]
     
     async def get_related_items_async(self, item_ids):
         """Async get related items using Neo4j relationships"""
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
         return await loop.run_in_executor(None, self.get_related_items, item_ids)
     
     def get_related_items(self, item_ids):
         """Get related items using Neo4j relationships for multiple IDs"""
         facts = []
         with self.neo4j_driver.session() as session:
-            for item_id in item_ids:
-                result = session.run("""
-                    MATCH (source {id: $item_id})-[r]->(target)
-                    RETURN target.id as id, target.name as name, 
-                           target.description as description, type(r) as relation
-                    LIMIT 3
-                """, item_id=item_id)
-                
-                for record in result:
-                    facts.append({
-                        "source": item_id,
-                        "relation": record["relation"],
-                        "target_name": record["name"],
-                        "target_desc": (record["description"] or "")[:200]
-                    })
+            # One round trip for all ids; keep up to 3 outgoing relations per id
+            result = session.run(GET_RELATED_CYPHER, item_ids=item_ids)
+            
+            for record in result:
+                facts.append({
+                    "source": record["source"],
+                    "relation": record["relation"],
+                    "target_name": record["name"],
+                    "target_desc": (record["description"] or "")[:200]
+                })
         
         return facts
     
@@ -121,12 +336,9 @@ class VietnamTravelChatbot:
         return summary
     
     async def get_rag_context_async(self, query):
-        """Async get context from both vector and graph search in parallel"""
-        # Run vector and graph searches in parallel
-        similar_task = self.search_similar_async(query, top_k=5)
-        
-        # Start vector search
-        similar_items = await similar_task
+        """Async get context from vector search followed by graph search"""
+        # Graph search needs the vector hits' ids, so the two stages are chained
+        similar_items = await self.search_similar_async(query, top_k=5)
         
         # Start graph search if we have results
         if similar_items:
@@ -161,42 +373,29 @@ class VietnamTravelChatbot:
     def generate_response(self, user_query, similar_items, related_items):
         """Generate AI response using OpenRouter with structured context"""
         # Format vector context
-        vec_context = []
-        for item in similar_items:
-            meta = item['metadata']
-            score = item.get('score', 0)
-            vec_context.append(f"- {meta.get('name', '')} ({meta.get('type', '')}) in {meta.get('city', 'Vietnam')} [similarity: {score:.3f}]")
+        vec_context = "\n".join(
+            f"- {meta.get('name', '')} ({meta.get('type', '')}) in {meta.get('city', 'Vietnam')} [similarity: {item.get('score', 0):.3f}]"
+            for item in similar_items[:5]
+            for meta in (item['metadata'],)
+        )
         
         # Format graph context
-        graph_context = []
-        for fact in related_items:
-            graph_context.append(f"- {fact['target_name']} ({fact['relation']} from {fact['source']}): {fact['target_desc']}")
-        
-        system_prompt = (
-            "You are a helpful Vietnam travel assistant with access to semantic search and knowledge graph data. "
-            "Follow this chain of thought:\n"
-            "1. ANALYZE: What type of travel experience is the user seeking?\n"
-            "2. MATCH: Which locations from the search results best fit their needs?\n"
-            "3. CONNECT: What related places or activities enhance the experience?\n"
-            "4. RECOMMEND: Provide specific, actionable suggestions with reasoning.\n"
-            "Be specific, cite actual places, and explain why each recommendation fits their query."
+        graph_context = "\n".join(
+            f"- {fact['target_name']} ({fact['relation']} from {fact['source']}): {fact['target_desc']}"
+            for fact in related_items[:10]
         )
         
-        user_prompt = f"""User query: {user_query}
-
-Top semantic matches:
-{chr(10).join(vec_context[:5])}
-
-Related places and connections:
-{chr(10).join(graph_context[:10])}
-
-Based on the above context, provide a helpful response with specific recommendations."""
+        user_prompt = self.USER_PROMPT_TEMPLATE.format(
+            query=user_query,
+            vec_context=vec_context,
+            graph_context=graph_context
+        )
 
         try:
             response = self.llm_client.chat.completions.create(
                 model="openai/gpt-3.5-turbo",
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": self.SYSTEM_PROMPT},
                     {"role": "user", "content": user_prompt}
                 ],
                 max_tokens=600,
@@ -247,7 +446,7 @@ async def main_async():
             user_input = input("Enter your travel question: ").strip()
             
             if user_input.lower() in ['quit', 'exit', 'q']:
-                print(f"Thanks for using Vietnam Travel Chatbot! Cache hits: {len(chatbot.embedding_cache)}")
+                print(f"Thanks for using Vietnam Travel Chatbot! Cache hits: {chatbot.cached_encode.cache_info().hits}")
                 break
             
             if not user_input:
@@ -259,7 +458,8 @@ async def main_async():
             print(f"\nAI Response:")
             print("-" * 30)
             print(response)
-            print(f"\nCache size: {len(chatbot.embedding_cache)} embeddings")
+            cache_info = chatbot.cached_encode.cache_info()
+            print(f"\nCache size: {cache_info.currsize} embeddings ({cache_info.hits} hits, {cache_info.misses} misses)")
             print("\n" + "=" * 50 + "\n")
     
     except KeyboardInterrupt:
@@ -269,7 +469,7 @@ async def main_async():
         print(f"Error: {e}")
     
     finally:
-        chatbot.close()
+        await chatbot.aclose()
 
 def main():
     print("Vietnam Travel Chatbot")
@@ -284,7 +484,7 @@ def main():
             user_input = input("Enter your travel question: ").strip()
             
             if user_input.lower() in ['quit', 'exit', 'q']:
-                print(f"Thanks for using Vietnam Travel Chatbot! Cache hits: {len(chatbot.embedding_cache)}")
+                print(f"Thanks for using Vietnam Travel Chatbot! Cache hits: {chatbot.cached_encode.cache_info().hits}")
                 break
             
             if not user_input:
@@ -296,7 +496,8 @@ def main():
             print(f"\nAI Response:")
             print("-" * 30)
             print(response)
-            print(f"\nCache size: {len(chatbot.embedding_cache)} embeddings")
+            cache_info = chatbot.cached_encode.cache_info()
+            print(f"\nCache size: {cache_info.currsize} embeddings ({cache_info.hits} hits, {cache_info.misses} misses)")
             print("\n" + "=" * 50 + "\n")
     
     except KeyboardInterrupt:
@@ -1,13 +1,51 @@
 import json
+from collections import defaultdict
 from neo4j import GraphDatabase
 from tqdm import tqdm
 import config
 
+# Labels and relation types in vietnam_travel_database.json get a fixed query text each
+KNOWN_NODE_TYPES = ("City", "Attraction", "Hotel", "Activity")
+KNOWN_REL_TYPES = ("Located_In", "Available_In", "Connected_To", "RELATED_TO")
+
+# Fallbacks for anything else: the label/type is a parameter, so the query text never changes
+UPSERT_NODES_APOC = """
+    UNWIND $rows AS row
+    CALL apoc.merge.node([$node_type, 'Entity'], {id: row.id}, row.props, row.props) YIELD node
+    RETURN count(node)
+"""
+CREATE_RELATIONSHIPS_APOC = """
+    UNWIND $rows AS row
+    MATCH (a:Entity {id: row.source_id}), (b:Entity {id: row.target_id})
+    CALL apoc.merge.relationship(a, $rel_type, {}, {}, b) YIELD rel
+    RETURN count(rel)
+"""
+
 class Neo4jUploader:
     def __init__(self):
+        # Pre-built query text per known label so Neo4j reuses one cached plan for each
+        self.node_queries = {
+            node_type: f"""
+                UNWIND $rows AS row
+                MERGE (n:{node_type}:Entity {{id: row.id}})
+                SET n += row.props
+            """
+            for node_type in KNOWN_NODE_TYPES
+        }
+        self.relationship_queries = {
+            rel_type: f"""
+                UNWIND $rows AS row
+                MATCH (a:Entity {{id: row.source_id}}), (b:Entity {{id: row.target_id}})
+                MERGE (a)-[r:{rel_type}]->(b)
+            """
+            for rel_type in KNOWN_REL_TYPES
+        }
+        
         self.driver = GraphDatabase.driver(
             config.NEO4J_URI,
-            auth=(config.NEO4J_USER, config.NEO4J_PASSWORD)
+            auth=(config.NEO4J_USER, config.NEO4J_PASSWORD),
+            max_connection_pool_size=50,
+            connection_acquisition_timeout=30.0
         )
     
     def close(self):
@@ -22,60 +60,71 @@ class Neo4jUploader:
     def create_constraints(self):
         """Create unique constraints"""
         with self.driver.session() as session:
-            # Generic Entity constraint + specific type constraints
+            # Only the generic Entity constraint: every node also carries the :Entity
+            # label and all lookups match on (:Entity {id}), so per-type constraints
+            # (City/Attraction/Hotel/Activity) would just add a second index to
+            # maintain on every MERGE. Don't re-add them.
             constraints = [
-                "CREATE CONSTRAINT IF NOT EXISTS FOR (n:Entity) REQUIRE n.id IS UNIQUE",
-                "CREATE CONSTRAINT IF NOT EXISTS FOR (c:City) REQUIRE c.id IS UNIQUE",
-                "CREATE CONSTRAINT IF NOT EXISTS FOR (a:Attraction) REQUIRE a.id IS UNIQUE",
-                "CREATE CONSTRAINT IF NOT EXISTS FOR (h:Hotel) REQUIRE h.id IS UNIQUE",
-                "CREATE CONSTRAINT IF NOT EXISTS FOR (act:Activity) REQUIRE act.id IS UNIQUE"
+                "CREATE CONSTRAINT IF NOT EXISTS FOR (n:Entity) REQUIRE n.id IS UNIQUE"
             ]
             
-            for constraint in constraints:
-                session.execute_write(lambda tx: tx.run(constraint))
+            # Send all schema statements in one explicit transaction
+            with session.begin_transaction() as tx:
+                for constraint in constraints:
+                    tx.run(constraint)
+                tx.commit()
             print("Constraints created")
     
     def upload_nodes(self, data):
-        """Upload all nodes to Neo4j using MERGE for idempotent operations"""
-        with self.driver.session() as session:
-            for item in tqdm(data, desc="Creating nodes"):
-                session.execute_write(self._upsert_node, item)
+        """Upload all nodes to Neo4j using one UNWIND + MERGE per node type"""
+        groups = defaultdict(list)
+        for item in data:
+            # Exclude connections from properties
+            props = {k: v for k, v in item.items() if k not in ('connections',)}
+            groups[item.get('type', 'Unknown')].append({"id": item['id'], "props": props})
+        
+        # Progress advances once per batch, counted in nodes
+        with self.driver.session() as session, tqdm(total=len(data), desc="Creating nodes", unit="node", mininterval=0.5) as progress:
+            for node_type, rows in groups.items():
+                session.execute_write(self._upsert_nodes, node_type, rows)
+                progress.update(len(rows))
         print(f"Uploaded {len(data)} nodes")
     
-    def _upsert_node(self, tx, item):
-        """Upsert a single node with dynamic properties"""
-        node_type = item.get('type', 'Unknown')
-        # Exclude connections from properties
-        props = {k: v for k, v in item.items() if k not in ('connections',)}
-        
+    def _upsert_nodes(self, tx, node_type, rows):
+        """Upsert a batch of nodes sharing one label"""
         # Use MERGE for idempotent operations + add Entity label
-        tx.run(f"""
-            MERGE (n:{node_type}:Entity {{id: $id}})
-            SET n += $props
-        """, id=item['id'], props=props)
+        query = self.node_queries.get(node_type)
+        if query is None:
+            tx.run(UPSERT_NODES_APOC, rows=rows, node_type=node_type)
+        else:
+            tx.run(query, rows=rows)
     
     def create_relationships(self, data):
-        """Create relationships between nodes using MERGE"""
-        with self.driver.session() as session:
-            for item in tqdm(data, desc="Creating relationships"):
-                connections = item.get('connections', [])
-                for connection in connections:
-                    session.execute_write(self._create_relationship, item['id'], connection)
+        """Create relationships between nodes using one UNWIND + MERGE per relation type"""
+        groups = defaultdict(list)
+        for item in data:
+            for connection in item.get('connections', []):
+                target_id = connection.get('target')
+                if not target_id:
+                    continue
+                rel_type = connection.get('relation', 'RELATED_TO')
+                groups[rel_type].append({"source_id": item['id'], "target_id": target_id})
+        
+        total = sum(len(rows) for rows in groups.values())
+        with self.driver.session() as session, tqdm(total=total, desc="Creating relationships", unit="rel", mininterval=0.5) as progress:
+            for rel_type, rows in groups.items():
+                session.execute_write(self._create_relationships, rel_type, rows)
+                progress.update(len(rows))
         print("Relationships created")
     
-    def _create_relationship(self, tx, source_id, connection):
-        """Create a single relationship"""
-        rel_type = connection.get('relation', 'RELATED_TO')
-        target_id = connection.get('target')
-        if not target_id:
-            return
-        
+    def _create_relationships(self, tx, rel_type, rows):
+        """Create a batch of relationships sharing one type"""
         # Use MERGE for idempotent relationship creation
-        tx.run(f"""
-            MATCH (a:Entity {{id: $source_id}}), (b:Entity {{id: $target_id}})
-            MERGE (a)-[r:{rel_type}]->(b)
-            RETURN r
-        """, source_id=source_id, target_id=target_id)
+        query = self.relationship_queries.get(rel_type)
+        if query is None:
+            tx.run(CREATE_RELATIONSHIPS_APOC, rows=rows, rel_type=rel_type)
+        else:
+            tx.run(query, rows=rows)
 
 def main():
     # Load data
@@ -1,14 +1,19 @@
 # pinecone_upload.py
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 from openai import OpenAI
+from sentence_transformers import SentenceTransformer
 from pinecone import Pinecone, ServerlessSpec
 import config
 
 # Config
 DATA_FILE = "vietnam_travel_database.json"
 BATCH_SIZE = 32
+EMBED_BATCH_SIZE = 64
+UPSERT_WORKERS = 8
+MAX_RETRIES = 5
 
 INDEX_NAME = config.PINECONE_INDEX_NAME
 VECTOR_DIM = 384  # 384 for sentence-transformers all-MiniLM-L6-v2
@@ -55,12 +60,29 @@ except Exception as e:
     exit(1)
 
 # Helper functions
+_MODEL = None
+
+def _get_model(name):
+    """Load the sentence transformer on first use and reuse it afterwards"""
+    global _MODEL
+    if _MODEL is None:
+        _MODEL = SentenceTransformer(name)
+    return _MODEL
+
 def get_embeddings(texts, model="all-MiniLM-L6-v2"):
-    """Generate embeddings using local sentence transformer."""
-    from sentence_transformers import SentenceTransformer
-    embedding_model = SentenceTransformer(model)
-    embeddings = embedding_model.encode(texts)
-    return embeddings.tolist()
+    """Generate embeddings using local sentence transformer.
+
+    Pass the full list of texts in one call: encode() sorts them by length
+    internally, so each mini-batch only pads to its own longest text.
+    """
+    embeddings = _get_model(model).encode(
+        texts,
+        batch_size=EMBED_BATCH_SIZE,
+        show_progress_bar=True,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    )
+    return embeddings.astype("float32", copy=False)
 
 def get_embeddings_http(texts, model="text-embedding-3-small"):
     """Fallback HTTP method for embeddings"""
@@ -96,6 +118,16 @@ def chunked(iterable, n):
     for i in range(0, len(iterable), n):
         yield iterable[i:i+n]
 
+def upsert_with_retry(vectors):
+    """Upsert a batch, backing off exponentially when Pinecone rate-limits us"""
+    for attempt in range(MAX_RETRIES):
+        try:
+            return index.upsert(vectors=vectors)
+        except Exception as e:
+            if getattr(e, "status", None) != 429 or attempt == MAX_RETRIES - 1:
+                raise
+            time.sleep(0.5 * 2 ** attempt)
+
 
 def main():
     with open(DATA_FILE, "r", encoding="utf-8") as f:
@@ -115,25 +147,32 @@ def main():
         }
         items.append((node["id"], semantic_text, meta))
     print(f"Preparing to upsert {len(items)} items to Pinecone...")
-    for batch in tqdm(list(chunked(items, BATCH_SIZE)), desc="Uploading batches"):
-        ids = [item[0] for item in batch]
-        texts = [item[1] for item in batch]
-        metas = [item[2] for item in batch]
-        embeddings = get_embeddings(texts, model="all-MiniLM-L6-v2")
-        vectors = [
-            {"id": _id, "values": emb, "metadata": meta}
-            for _id, emb, meta in zip(ids, embeddings, metas)
-        ]
 
-        try:
-            index.upsert(vectors=vectors)
-        except Exception as e:
-            print(f"[ERROR] Upsert failed: {e}")
-            # Continue with next batch
-            continue
-        time.sleep(0.2)
+    # Embed everything in one length-sorted pass, then keep several upserts in flight at once
+    texts = [item[1] for item in items]
+    embeddings = get_embeddings(texts, model="all-MiniLM-L6-v2")
+    vectors = [
+        {"id": _id, "values": emb.tolist(), "metadata": meta}
+        for (_id, _, meta), emb in zip(items, embeddings)
+    ]
+
+    batches = list(chunked(vectors, BATCH_SIZE))
+    failed_batches = 0
+    with ThreadPoolExecutor(max_workers=UPSERT_WORKERS) as executor:
+        futures = [executor.submit(upsert_with_retry, batch) for batch in batches]
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Uploading batches", mininterval=0.5, smoothing=0.05):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"[ERROR] Upsert failed: {e}")
+                failed_batches += 1
+                # Continue with remaining batches
+                continue
 
-    print("All items uploaded successfully.")
+    if failed_batches:
+        print(f"Upload finished with {failed_batches} of {len(batches)} batches failed.")
+    else:
+        print("All items uploaded successfully.")
 
 # -----------------------------
 if __name__ == "__main__":
@@ -16,7 +16,9 @@ class VietnamTravelRAG:
         # Initialize Neo4j
         self.neo4j_driver = GraphDatabase.driver(
             config.NEO4J_URI,
-            auth=(config.NEO4J_USER, config.NEO4J_PASSWORD)
+            auth=(config.NEO4J_USER, config.NEO4J_PASSWORD),
+            max_connection_pool_size=50,
+            connection_acquisition_timeout=30.0
         )
     
     def close(self):
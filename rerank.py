@@ -0,0 +1,50 @@
+import numpy as np
+
+# Numba is optional; without it the same loops run through numpy
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def cosine_scores(q, M):
+        """Exact cosine similarity between query vector q and each row of M"""
+        q_norm = 0.0
+        for j in range(q.shape[0]):
+            q_norm += q[j] * q[j]
+        q_norm = np.sqrt(q_norm)
+
+        out = np.empty(M.shape[0], dtype=np.float32)
+        for i in prange(M.shape[0]):
+            dot = 0.0
+            m_norm = 0.0
+            for j in range(M.shape[1]):
+                dot += q[j] * M[i, j]
+                m_norm += M[i, j] * M[i, j]
+            denom = q_norm * np.sqrt(m_norm)
+            out[i] = dot / denom if denom > 0.0 else 0.0
+        return out
+else:
+    def cosine_scores(q, M):
+        """Exact cosine similarity between query vector q and each row of M"""
+        denom = np.linalg.norm(M, axis=1) * np.linalg.norm(q)
+        return np.where(denom > 0, M @ q / np.where(denom > 0, denom, 1), 0).astype(np.float32)
+
+def rerank(query_vector, matches):
+    """Re-score Pinecone matches (fetched with include_values=True) and sort by exact cosine"""
+    if not matches or not all(match.get('values') for match in matches):
+        return matches
+
+    q = np.asarray(query_vector, dtype=np.float32)
+    M = np.asarray([match['values'] for match in matches], dtype=np.float32)
+    scores = cosine_scores(q, M)
+
+    for match, score in zip(matches, scores):
+        match['score'] = float(score)
+    return [matches[i] for i in np.argsort(-scores)]
+
+def warmup(dim=384):
+    """Trigger Numba JIT compilation up front so the first real query doesn't pay for it"""
+    cosine_scores(np.ones(dim, dtype=np.float32), np.ones((1, dim), dtype=np.float32))